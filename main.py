@@ -23,16 +23,25 @@ logging.basicConfig(level=logging.INFO)
 # =========================
 from pipeline_execution.pipeline_parallel_execution import (
     RUNS,
-    _RUNS_LOCK,
-    _PIPELINE_SEMAPHORE,
+    _lock_for,
+    release_run_lock,
     create_run_records,
     async_run_intake,
     async_run_research,
     async_run_finalize,
     safe_update_run,
+    start_email_worker,
+    stop_email_worker,
+    start_progress_flusher,
+    stop_progress_flusher,
 )
 
-from pipeline_execution.full_pipeline import write_json_atomic
+from pipeline_execution.full_pipeline import (
+    write_json_atomic,
+    shutdown_async_loop,
+    shutdown_cpu_pool,
+)
+from utils.mailer import close_mailer
 
 # =========================
 # API-only helpers
@@ -48,17 +57,25 @@ def is_valid_email(email: str) -> bool:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("LeadFoundry API starting up")
+    start_email_worker()
+    start_progress_flusher()
     yield
     logger.info("LeadFoundry API shutting down")
+    await stop_email_worker()
+    await stop_progress_flusher()
+
+    for meta in list(RUNS.values()):
+        try:
+            lock = meta["run_dir_path"] / ".pipeline.lock"
+            if lock.exists():
+                lock.unlink()
+        except Exception:
+            logger.exception("Shutdown cleanup failed")
 
-    async with _RUNS_LOCK:
-        for meta in RUNS.values():
-            try:
-                lock = Path(meta["run_dir"]) / ".pipeline.lock"
-                if lock.exists():
-                    lock.unlink()
-            except Exception:
-                logger.exception("Shutdown cleanup failed")
+    # close the pipeline loop's HTTP client and enrichment MCP servers
+    await asyncio.to_thread(shutdown_async_loop)
+    await asyncio.to_thread(shutdown_cpu_pool)
+    await close_mailer()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -101,11 +118,10 @@ async def cleanup_stale_runs(
         except Exception:
             continue
         
-        async with _RUNS_LOCK:
-            is_active = any(
-                meta.get("run_dir") == str(folder)
-                for meta in RUNS.values()
-            )
+        is_active = any(
+            meta.get("run_dir") == str(folder)
+            for meta in list(RUNS.values())
+        )
         
         if is_active:
             continue
@@ -147,6 +163,8 @@ async def create_and_start_run(payload: Dict):
     else:
         meta["execution_mode"] = "manual"
 
+    meta["config"].finalize_parallel = bool(payload.get("finalize_parallel"))
+
     await asyncio.to_thread(
         write_json_atomic,
         payload,
@@ -154,14 +172,9 @@ async def create_and_start_run(payload: Dict):
         False,  
     )
 
-    async with _RUNS_LOCK:
-        RUNS[run_id] = meta
-
-    async def _wrapped():
-        async with _PIPELINE_SEMAPHORE:
-            await async_run_intake(run_id)
+    RUNS[run_id] = meta
 
-    task = asyncio.create_task(_wrapped())
+    task = asyncio.create_task(async_run_intake(run_id))
     await safe_update_run(run_id, task=task, status="intake_queued")
 
     return {
@@ -178,7 +191,7 @@ async def start_research(run_id: str):
     Explicitly start research.
     Required only for manual (non-email) runs.
     """
-    async with _RUNS_LOCK:
+    async with _lock_for(run_id):
         meta = RUNS.get(run_id)
         if not meta:
             raise HTTPException(404, "run_id not found")
@@ -186,11 +199,7 @@ async def start_research(run_id: str):
         if meta["status"] not in ("intake_completed", "research_failed"):
             raise HTTPException(409, "Research cannot be started in current state")
 
-    async def _wrapped():
-        async with _PIPELINE_SEMAPHORE:
-            await async_run_research(run_id)
-
-    task = asyncio.create_task(_wrapped())
+    task = asyncio.create_task(async_run_research(run_id))
     await safe_update_run(run_id, task=task, status="research_queued")
 
     return {"run_id": run_id, "status": "research_queued"}
@@ -202,13 +211,13 @@ async def finalize_full(run_id: str):
     Idempotent finalize endpoint.
     Safe to call multiple times.
     """
-    async with _RUNS_LOCK:
+    async with _lock_for(run_id):
         meta = RUNS.get(run_id)
         if not meta:
             raise HTTPException(404, "run_id not found")
 
         if meta.get("phase") == "done":
-            outputs = Path(meta["run_dir"]) / "outputs"
+            outputs = meta["run_dir_path"] / "outputs"
             return {
                 "run_id": run_id,
                 "status": meta["status"],
@@ -222,21 +231,16 @@ async def finalize_full(run_id: str):
         if meta.get("phase") == "finalize":
             return {"run_id": run_id, "status": meta["status"]}
 
-        run_dir = meta["run_dir"]
-
-    async def _wrapped():
-        async with _PIPELINE_SEMAPHORE:
-            await async_run_finalize(run_id)
+        run_dir = meta["run_dir_path"]
 
-    task = asyncio.create_task(_wrapped())
+    task = asyncio.create_task(async_run_finalize(run_id))
     await safe_update_run(run_id, task=task, status="finalize_queued")
 
     await task
 
-    async with _RUNS_LOCK:
-        meta = RUNS[run_id]
+    meta = RUNS[run_id]
 
-    outputs = Path(run_dir) / "outputs"
+    outputs = run_dir / "outputs"
 
     return {
         "run_id": run_id,
@@ -254,13 +258,12 @@ async def download_excel(run_id: str):
     """
     Download final Excel output.
     """
-    async with _RUNS_LOCK:
-        meta = RUNS.get(run_id)
+    meta = RUNS.get(run_id)
 
     if not meta:
         raise HTTPException(404, "run_id not found")
 
-    excel = Path(meta["run_dir"]) / "outputs" / "final_leads_list.xlsx"
+    excel = meta["run_dir_path"] / "outputs" / "final_leads_list.xlsx"
     if not excel.exists():
         raise HTTPException(404, "excel not found")
 
@@ -277,8 +280,7 @@ async def get_status(run_id: str):
     Canonical status endpoint.
     Returns engine-owned truth.
     """
-    async with _RUNS_LOCK:
-        meta = RUNS.get(run_id)
+    meta = RUNS.get(run_id)
 
     if not meta:
         raise HTTPException(404, "run_id not found")
@@ -305,8 +307,7 @@ async def cancel_run(run_id: str):
     """
     Signal cancellation to engine and cancel async task.
     """
-    async with _RUNS_LOCK:
-        meta = RUNS.get(run_id)
+    meta = RUNS.get(run_id)
 
     if not meta:
         raise HTTPException(404, "run_id not found")
@@ -318,5 +319,6 @@ async def cancel_run(run_id: str):
         task.cancel()
 
     await safe_update_run(run_id, status="cancelling")
+    release_run_lock(run_id)
 
     return {"run_id": run_id, "status": "cancelling"}
@@ -15,8 +15,10 @@ Organized:
 """
 from __future__ import annotations
 
+import asyncio
 import os
 import re
+import weakref
 from typing import Any, List, Dict
 from urllib.parse import urlparse, urlunparse
 
@@ -24,7 +26,7 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field, field_validator
 
 from openai import AsyncOpenAI
-from agents import Agent, OpenAIChatCompletionsModel, AgentOutputSchema
+from agents import Agent, Model, OpenAIChatCompletionsModel, OpenAIResponsesModel, AgentOutputSchema
 
 from multiple_source_lead_search.map_scraping_tools_final import serpapi_lead_search
 from multiple_source_lead_search.research_prompts_config import (
@@ -162,6 +164,72 @@ except Exception:
     logger.exception("Failed initializing OpenAI model")
     raise
 
+STRUCTURING_MODEL_NAME = "gpt-4.1-mini"
+
+# The AsyncOpenAI connection pool is bound to the loop that first uses it, and
+# research queries may run on several loops at once (one per worker thread).
+# Each loop gets its own client, shared by every model built on that loop.
+_LOOP_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+_LOOP_MODELS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, Model]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _loop_model(model_cls: type, model_name: str) -> Model:
+    loop = asyncio.get_running_loop()
+    models = _LOOP_MODELS.setdefault(loop, {})
+    loop_model = models.get((model_cls, model_name))
+    if loop_model is None:
+        client = _LOOP_CLIENTS.get(loop)
+        if client is None:
+            client = _LOOP_CLIENTS[loop] = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        loop_model = models[(model_cls, model_name)] = model_cls(
+            model=model_name,
+            openai_client=client,
+        )
+    return loop_model
+
+
+def research_model() -> OpenAIChatCompletionsModel:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return model
+    return _loop_model(OpenAIChatCompletionsModel, model.model)
+
+
+def structuring_model() -> Model | str:
+    # Responses API, as the plain model name resolved to via the default provider
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return STRUCTURING_MODEL_NAME
+    return _loop_model(OpenAIResponsesModel, STRUCTURING_MODEL_NAME)
+
+
+async def close_loop_models() -> None:
+    """Close the running loop's OpenAI client before the loop goes away."""
+    loop = asyncio.get_running_loop()
+    _LOOP_MODELS.pop(loop, None)
+    client = _LOOP_CLIENTS.pop(loop, None)
+    if client is not None:
+        try:
+            await client.close()
+        except Exception:
+            logger.warning("Closing per-loop OpenAI client failed", exc_info=True)
+
+
+def research_mcp_servers() -> list:
+    """
+    Fresh server objects per agent: each run connects (and tears down) its own,
+    so concurrent runs never share a connection.
+    """
+    if not DEFAULT_MCP_SERVERS:
+        return []
+    return researcher_mcp_stdio_servers(client_session_timeout_seconds=120)
+
 
 # ---------------------------------------------------------------------
 # Agent factories
@@ -170,8 +238,8 @@ def create_linkedin_search_agent() -> Agent:
     return Agent(
         name="linkedin_research_agent",
         instructions=LINKEDIN_SEARCH_AGENT_FETCH_INSTRUCTIONS,
-        model=model,
-        mcp_servers=DEFAULT_MCP_SERVERS,
+        model=research_model(),
+        mcp_servers=research_mcp_servers(),
         tools=LINKEDIN_TOOLS,
     )
 
@@ -180,8 +248,8 @@ def create_facebook_search_agent() -> Agent:
     return Agent(
         name="facebook_research_agent",
         instructions=FACEBOOK_SEARCH_AGENT_FETCH_INSTRUCTIONS,
-        model=model,
-        mcp_servers=DEFAULT_MCP_SERVERS,
+        model=research_model(),
+        mcp_servers=research_mcp_servers(),
         tools=FACEBOOK_TOOLS,
     )
 
@@ -190,8 +258,8 @@ def create_company_website_search_agent() -> Agent:
     return Agent(
         name="company_website_research_agent",
         instructions=WEBSITE_SEARCH_AGENT_FETCH_INSTRUCTIONS,
-        model=model,
-        mcp_servers=DEFAULT_MCP_SERVERS,
+        model=research_model(),
+        mcp_servers=research_mcp_servers(),
         tools=WEBSITE_TOOLS,
     )
 
@@ -200,8 +268,8 @@ def create_serpapi_search_agent() -> Agent:
     return Agent(
         name="serpapi_lead_agent",
         instructions=GMAP_SEARCH_AGENT_FETCH_INSTRUCTIONS,
-        model=model,
-        mcp_servers=DEFAULT_MCP_SERVERS,
+        model=research_model(),
+        mcp_servers=research_mcp_servers(),
         tools=SERPAPI_TOOLS,
     )
 
@@ -212,7 +280,7 @@ def create_serpapi_search_agent() -> Agent:
 def create_structuring_agent() -> Agent:
     return Agent(
         name="lead_structuring_agent",
-        model="gpt-4.1-mini",
+        model=structuring_model(),
         mcp_servers=[],     
         tools=[],           
         instructions="""
@@ -17,6 +17,7 @@ from multiple_source_lead_search.agent_models_and_structure import (
     create_company_website_search_agent,
     create_serpapi_search_agent,
     create_structuring_agent,
+    close_loop_models,
 )
 
 logger = logging.getLogger(__name__)
@@ -182,23 +183,27 @@ async def run_all_agents(query: str, json_path: str) -> None:
 
     all_leads: List[Dict[str, Any]] = []
 
-    for name, factory in agent_creators:
-        trace_name = f"run_{name}_agent"
-        try:
-            agent = factory()
-            structured = await common_research_agent_runner(agent, query, trace_name)
-            all_leads.append(structured)
-            logger.info(
-                "Agent %s completed: collected %d leads",
-                name,
-                len(structured.get("leads", [])) if isinstance(structured, dict) else 0,
-            )
-        except CustomException as ce:
-            logger.error("Agent %s failed with CustomException: %s", name, ce)
-            all_leads.append({"agent": name, "error": str(ce)})
-        except Exception as e:
-            logger.exception("Agent %s unexpected error: %s", name, e)
-            all_leads.append({"agent": name, "error": str(e)})
+    try:
+        for name, factory in agent_creators:
+            trace_name = f"run_{name}_agent"
+            try:
+                agent = factory()
+                structured = await common_research_agent_runner(agent, query, trace_name)
+                all_leads.append(structured)
+                logger.info(
+                    "Agent %s completed: collected %d leads",
+                    name,
+                    len(structured.get("leads", [])) if isinstance(structured, dict) else 0,
+                )
+            except CustomException as ce:
+                logger.error("Agent %s failed with CustomException: %s", name, ce)
+                all_leads.append({"agent": name, "error": str(ce)})
+            except Exception as e:
+                logger.exception("Agent %s unexpected error: %s", name, e)
+                all_leads.append({"agent": name, "error": str(e)})
+    finally:
+        # this loop's OpenAI client dies with it; close its pool first
+        await close_loop_models()
 
     consolidate_and_save(all_leads, json_path)
 
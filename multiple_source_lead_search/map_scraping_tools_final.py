@@ -3,6 +3,7 @@ from __future__ import annotations
 import sys
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Any, Dict, List
 
 from dotenv import load_dotenv
@@ -25,6 +26,11 @@ RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 
 TIMEOUT = 120
 
+# One pooled session for every provider call: keep-alive and TLS sessions are
+# reused across geocode + search requests instead of a fresh handshake each time
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=64))
+
 # -------------------------------------------------------------------------
 # GEOAPIFY GEOCODER
 # -------------------------------------------------------------------------
@@ -37,7 +43,7 @@ def _geocode(location: str) -> Dict[str, Any]:
     params = {"text": location, "apiKey": GEOAPIFY_API_KEY, "limit": 1}
 
     try:
-        r = requests.get(url, params=params, timeout=TIMEOUT)
+        r = SESSION.get(url, params=params, timeout=TIMEOUT)
         r.raise_for_status()
 
         feats = r.json().get("features", [])
@@ -118,7 +124,7 @@ def serpapi_lead_search(
     )
 
     try:
-        r = requests.get(
+        r = SESSION.get(
             "https://serpapi.com/search.json",
             params=params,
             timeout=TIMEOUT,
@@ -213,7 +219,7 @@ def gmaps_extractor_lead_search(
     logger.info("Calling GMaps Extractor for '%s' near '%s'", business_type, location)
 
     try:
-        r = requests.post(
+        r = SESSION.post(
             "https://cloud.gmapsextractor.com/api/v2/search",
             headers=headers,
             json=payload,
@@ -279,7 +285,7 @@ def _search_rapidapi(query: str, lat: float, lon: float, radius_m: int, max_resu
     }
 
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=TIMEOUT)
+        r = SESSION.get(url, params=params, headers=headers, timeout=TIMEOUT)
         r.raise_for_status()
         data = r.json()
     except Exception as e:
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 
-import json
 import re
+import sys
+from collections import defaultdict
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
+import orjson
+
 from utils.logger import logging
 from utils.exception import CustomException
 
@@ -13,6 +16,12 @@ logger = logging.getLogger(__name__)
 DEFAULT_SRC = Path("outputs/lead_list_consolidated.json")
 DEFAULT_OUT_DEDUPE = Path("outputs/lead_list_deduped.json")
 
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+# Stripped in this order, so "acme corp inc" loses both suffixes
+_SUFFIXES = (" inc", " inc.", " ltd", " ltd.", " llc", " corp", " co", " co.")
+_EMPTY = frozenset(("", "unknown"))
+
 
 # =========================
 # Normalization helpers
@@ -24,13 +33,16 @@ def norm_company(name: Optional[str]) -> Optional[str]:
     if not name:
         return None
 
-    s = re.sub(r"[^\w\s]", "", str(name).strip().lower())
-    for suf in (" inc", " inc.", " ltd", " ltd.", " llc", " corp", " co", " co."):
-        if s.endswith(suf):
-            s = s[:-len(suf)]
+    s = _PUNCT_RE.sub("", str(name).strip().lower())
+    # Single C-level check first; most names carry no legal suffix at all
+    if s.endswith(_SUFFIXES):
+        for suf in _SUFFIXES:
+            if s.endswith(suf):
+                s = s[:-len(suf)]
 
-    s = re.sub(r"\s+", " ", s).strip()
-    return s or None
+    s = _WS_RE.sub(" ", s).strip()
+    # Interned so equal keys compare and hash by identity in the buckets
+    return sys.intern(s) if s else None
 
 
 def score_record(rec: dict) -> int:
@@ -48,12 +60,30 @@ def score_record(rec: dict) -> int:
     return score
 
 
+def _is_empty(value) -> bool:
+    """
+    True for placeholder field values that may be backfilled.
+    """
+    return value is None or (isinstance(value, str) and value in _EMPTY)
+
+
+def load_leads(input_path: Path) -> List[Dict]:
+    """
+    Read lead dicts from a {"leads": [...]} file or a bare JSON list.
+    """
+    data = orjson.loads(input_path.read_bytes())
+    if isinstance(data, dict):
+        data = data.get("leads", [])
+    return data
+
+
 # =========================
 # Deduplication logic
 # =========================
 def dedupe_company_name(
     input_path: Path = DEFAULT_SRC,
     out_dedupe: Path = DEFAULT_OUT_DEDUPE,
+    out_ndjson: Optional[Path] = None,
 ) -> Tuple[int, int]:
     """
     Deduplicate leads by normalized company name.
@@ -63,6 +93,9 @@ def dedupe_company_name(
     - Pick the highest-quality record per group
     - Backfill missing fields from weaker duplicates
 
+    Writes the pretty-printed {"leads": [...]} file to out_dedupe and, only
+    when out_ndjson is given, the same leads as NDJSON (one object per line).
+
     Returns:
         (num_input_leads, num_output_leads)
     """
@@ -70,44 +103,64 @@ def dedupe_company_name(
     logger.info("Input path: %s", input_path)
 
     try:
-        raw_text = input_path.read_text(encoding="utf-8")
-        data = json.loads(raw_text)
-        leads: List[Dict] = data.get("leads", data) if isinstance(data, dict) else data
+        leads: List[Dict] = load_leads(input_path)
 
     except Exception as e:
         logger.exception("Failed to read or parse consolidated leads JSON")
         raise CustomException(e)
 
     try:
-        buckets: Dict[str, List[Dict]] = {}
+        # Buckets hold lead positions so scores can be looked up by index
+        buckets: Dict[str, List[int]] = defaultdict(list)
+        scores: List[int] = []
 
-        for lead in leads:
-            key = norm_company(lead.get("company") or lead.get("name"))
-            key = key or "__unknown__"
-            buckets.setdefault(key, []).append(lead)
+        for idx, lead in enumerate(leads):
+            key = norm_company(lead.get("company") or lead.get("name")) or "__unknown__"
+            buckets[key].append(idx)
+            scores.append(score_record(lead))
 
         deduped: List[Dict] = []
 
-        for key, group in buckets.items():
-            # Choose best canonical record
-            best = max(group, key=score_record)
+        for key, idxs in buckets.items():
+            group = [leads[i] for i in idxs]
+
+            # Choose best canonical record (singletons need no scoring)
+            best_idx = idxs[0] if len(idxs) == 1 else max(idxs, key=scores.__getitem__)
+            best = leads[best_idx]
             canon = dict(best)
 
+            # Fields still to backfill, in first-seen order; done once all filled
+            missing = dict.fromkeys(
+                field
+                for rec in group
+                if rec is not best
+                for field in rec
+                if _is_empty(canon.get(field))
+            )
+
             for rec in group:
+                if not missing:
+                    break
                 if rec is best:
                     continue
-                for field, value in rec.items():
-                    if canon.get(field) in (None, "", "unknown") and value not in (None, "", "unknown"):
+                for field in list(missing):
+                    value = rec.get(field)
+                    if not _is_empty(value):
                         canon[field] = value
+                        del missing[field]
 
             deduped.append(canon)
 
         out_dedupe.parent.mkdir(parents=True, exist_ok=True)
-        out_dedupe.write_text(
-            json.dumps({"leads": deduped}, indent=2, ensure_ascii=False),
-            encoding="utf-8",
+        out_dedupe.write_bytes(
+            orjson.dumps({"leads": deduped}, option=orjson.OPT_INDENT_2)
         )
 
+        if out_ndjson is not None:
+            with out_ndjson.open("wb") as f:
+                for rec in deduped:
+                    f.write(orjson.dumps(rec, option=orjson.OPT_APPEND_NEWLINE))
+
         logger.info("Leads before: %d | Leads after: %d", len(leads), len(deduped))
 
         return len(leads), len(deduped)
@@ -102,6 +102,16 @@ class EnrichmentOutput(BaseModel):
 # MCP servers (FETCH ONLY)
 # =========================
 
+def fetch_only_mcp_servers() -> list:
+    """
+    Fresh fetch-only server objects; a connected server belongs to one event loop.
+    """
+    return [
+        server for server in researcher_mcp_stdio_servers()
+        if server.name == "fetch_mcp"
+    ]
+
+
 ALL_MCP_SERVERS = researcher_mcp_stdio_servers()
 
 FETCH_ONLY_MCP_SERVERS = [
@@ -114,7 +124,7 @@ FETCH_ONLY_MCP_SERVERS = [
 # Agent factory
 # =========================
 
-def create_enrichment_agent() -> Agent:
+def create_enrichment_agent(mcp_servers: Optional[list] = None) -> Agent:
     return Agent(
         name="lead_enrichment_agent",
         model="gpt-4.1-mini",
@@ -123,6 +133,6 @@ def create_enrichment_agent() -> Agent:
             output_type=EnrichmentOutput,
             strict_json_schema=True,
         ),
-        mcp_servers=FETCH_ONLY_MCP_SERVERS,
+        mcp_servers=FETCH_ONLY_MCP_SERVERS if mcp_servers is None else mcp_servers,
         tools=[enrich_website_contacts]
     )
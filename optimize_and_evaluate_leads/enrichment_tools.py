@@ -2,11 +2,20 @@ import os
 import json
 import random
 import re
-from typing import Dict, Any
-from urllib.parse import urljoin
-
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager, suppress
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+
+import diskcache
+import httpx
+from charset_normalizer import from_bytes
+from selectolax.lexbor import LexborHTMLParser
 from agents import function_tool
 from dotenv import load_dotenv
 
@@ -34,6 +43,13 @@ COOKIE_SIGNALS = [
     "cookie settings",
 ]
 
+# Every block/cookie phrase in one case-insensitive pattern: a single scan of
+# the raw HTML instead of a lowercased copy plus one substring scan per phrase
+BLOCK_SIGNAL_RE = re.compile(
+    "|".join(re.escape(s) for s in HARD_BLOCK_KEYWORDS + COOKIE_SIGNALS),
+    re.IGNORECASE,
+)
+
 # --------------------------------------------------
 # Regex patterns (refined)
 # --------------------------------------------------
@@ -42,6 +58,13 @@ EMAIL_RE = re.compile(
     r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,24}\b'
 )
 PHONE_RE = re.compile(r"\+?[0-9][0-9\-\s().]{6,}[0-9]")
+ASSET_EXT_RE = re.compile(r'\.(png|jpg|jpeg|svg|gif|webp)$', re.I)
+WHITESPACE_RE = re.compile(r"\s+")
+# Deletion table for every non-digit PHONE_RE can match: separators, brackets,
+# "+" and Unicode whitespace (\s tops out at U+3000)
+_PHONE_NON_DIGITS = str.maketrans(
+    "", "", "-().+" + "".join(c for c in map(chr, range(0x3001)) if c.isspace())
+)
 
 # --------------------------------------------------
 # User agent pool (small randomization)
@@ -52,38 +75,181 @@ UA_POOL = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
 ]
 
+# --------------------------------------------------
+# Shared HTTP client + fetch limits (one set per event loop)
+# --------------------------------------------------
+# httpx connections and asyncio semaphores are bound to the loop that created
+# them, so the state is keyed by loop. In the pipeline that is the persistent
+# loop thread in full_pipeline, so this state lives across stages and runs;
+# standalone callers (e.g. run_enrichment's __main__) get their own.
+MAX_CONCURRENT_FETCHES = 64
+MAX_FETCHES_PER_HOST = 4
+MAX_HTML_BYTES = 512 * 1024
+FETCH_CHUNK_BYTES = 64 * 1024
+
+
+class _HostSlot:
+    __slots__ = ("sem", "users")
+
+    def __init__(self) -> None:
+        self.sem = asyncio.Semaphore(MAX_FETCHES_PER_HOST)
+        self.users = 0  # holders + waiters
+
+
+class _FetchState:
+    def __init__(self) -> None:
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            timeout=15,
+            follow_redirects=True,
+        )
+        self.global_sem = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+        self.host_slots: Dict[str, _HostSlot] = {}
+
+    @asynccontextmanager
+    async def host_slot(self, host: str):
+        # per-host semaphores exist only while someone holds or waits on them,
+        # so a long-lived loop does not accumulate one per host ever fetched
+        slot = self.host_slots.get(host)
+        if slot is None:
+            slot = self.host_slots[host] = _HostSlot()
+        slot.users += 1
+        try:
+            async with slot.sem:
+                yield
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                del self.host_slots[host]
+
+
+_FETCH_STATES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _FetchState]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_fetch_state() -> _FetchState:
+    loop = asyncio.get_running_loop()
+    state = _FETCH_STATES.get(loop)
+    if state is None or state.client.is_closed:
+        state = _FetchState()
+        _FETCH_STATES[loop] = state
+    return state
+
+
+async def close_http_client() -> None:
+    """
+    Close the current loop's client. Call before the loop shuts down.
+    """
+    state = _FETCH_STATES.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.client.aclose()
+
+
+# --------------------------------------------------
+# On-disk page cache (persists across runs)
+# --------------------------------------------------
+WEB_CACHE_DIR = "outputs/.web_cache"
+WEB_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+
+@lru_cache(maxsize=1)
+def _web_cache() -> diskcache.Cache:
+    return diskcache.Cache(WEB_CACHE_DIR)
+
+
+# diskcache is blocking sqlite I/O; these run in a worker thread, off the loop
+def _cache_get(key: str) -> Optional[dict]:
+    return _web_cache().get(key)
+
+
+def _cache_set(key: str, value: dict) -> None:
+    _web_cache().set(key, value, expire=WEB_CACHE_TTL_SECONDS)
+
+
+def _detect_encoding(data: bytearray) -> str:
+    """Best guess for a body served without a charset header."""
+    best = from_bytes(data).best()
+    return best.encoding if best is not None else "utf-8"
+
+
+def _cache_key(url: str) -> str:
+    """
+    Canonical URL: lowercase scheme/host, no trailing slash, no utm_* params.
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode([
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_")
+    ])
+    return urlunsplit((
+        parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""
+    ))
+
+
 # --------------------------------------------------
 # Internal fetcher (NOT exposed to agent)
 # --------------------------------------------------
-def _fetch_html_raw(url: str, timeout: int = 15) -> dict:
+async def _fetch_html_raw(url: str, timeout: int = 15) -> dict:
     headers = {
         "User-Agent": random.choice(UA_POOL),
         "Accept": "text/html,application/xhtml+xml",
         "Accept-Language": "en-US,en;q=0.9",
-        "Connection": "close",
     }
 
     try:
-        r = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-
-        if r.status_code in {403, 429, 503}:
-            return {"ok": False, "reason": f"blocked_status_{r.status_code}"}
-
-        # try to use the best encoding available
-        r.encoding = r.apparent_encoding or r.encoding
-
-        content_type = r.headers.get("Content-Type", "").lower()
-        if "text/html" not in content_type:
-            return {"ok": False, "reason": "not_html"}
-
-        html = (r.text or "").strip()
+        cache_key = _cache_key(url)
+        cached = await asyncio.to_thread(_cache_get, cache_key)
+        if cached is not None:
+            return cached
+
+        state = _get_fetch_state()
+        host = urlparse(url).netloc.lower()
+
+        # Per-host cap first: a task queued behind a busy host must not sit on
+        # a global slot. The global cap then bounds open sockets.
+        async with state.host_slot(host), state.global_sem:
+            async with state.client.stream(
+                "GET", url, headers=headers, timeout=timeout
+            ) as r:
+                if r.status_code in {403, 429, 503}:
+                    return {"ok": False, "reason": f"blocked_status_{r.status_code}"}
+
+                content_type = r.headers.get("Content-Type", "").lower()
+                if "text/html" not in content_type:
+                    return {"ok": False, "reason": "not_html"}
+
+                # stop reading oversized documents instead of buffering them whole
+                buf = bytearray()
+                async for chunk in r.aiter_bytes(FETCH_CHUNK_BYTES):
+                    buf.extend(chunk)
+                    if len(buf) >= MAX_HTML_BYTES:
+                        break
+
+                final_url = str(r.url)
+                encoding = r.charset_encoding
+
+        if encoding is None:
+            # no charset header: sniff the capped bytes instead of assuming utf-8
+            encoding = await asyncio.to_thread(_detect_encoding, buf)
+
+        try:
+            html = buf.decode(encoding, errors="replace")
+        except LookupError:
+            html = buf.decode("utf-8", errors="replace")
+
+        html = html.strip()
         # relaxed minimum size threshold
         if len(html) < 500:
             return {"ok": False, "reason": "html_too_small"}
 
-        return {"ok": True, "html": html, "final_url": r.url}
+        result = {"ok": True, "html": html, "final_url": final_url}
+        # only successful fetches are cached; blocks/timeouts are retried next run
+        with suppress(Exception):
+            await asyncio.to_thread(_cache_set, cache_key, result)
+        return result
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return {"ok": False, "reason": "timeout"}
 
     except Exception as e:
@@ -98,7 +264,7 @@ def _filter_emails(raw_emails):
     for e in raw_emails:
         e = e.strip()
         # drop obvious image filenames or assets
-        if re.search(r'\.(png|jpg|jpeg|svg|gif|webp)$', e, re.I):
+        if ASSET_EXT_RE.search(e):
             continue
         # drop localhost or single-label domains
         domain = e.split("@")[-1]
@@ -111,7 +277,7 @@ def _filter_emails(raw_emails):
 def _filter_phones(raw_phones):
     norm = set()
     for p in raw_phones:
-        digits = re.sub(r"\D", "", p)
+        digits = p.translate(_PHONE_NON_DIGITS)
         # ignore too short or improbable too long numbers
         if 8 <= len(digits) <= 15:
             # canonicalize: +<country?> if present otherwise digits
@@ -122,11 +288,120 @@ def _filter_phones(raw_phones):
     return sorted(norm)
 
 
+# --------------------------------------------------
+# Page parsing (memoized by content hash)
+# --------------------------------------------------
+LINK_KEYWORDS = (
+    "contact", "contact-us", "about", "impressum",
+    "team", "leadership", "press", "media", "career", "careers", "privacy", "terms"
+)
+PARSE_CACHE_SIZE = 256
+TEXT_SNIPPET_CHARS = 800
+
+
+class _ParsedPage(NamedTuple):
+    block_reason: Optional[str]
+    emails: List[str]
+    phones: List[str]
+    hrefs: Tuple[str, ...]
+    text_snippet: str
+
+
+# Mirrors and CDN redirects often serve identical HTML under different URLs.
+# Keyed by a digest so the cache never pins whole pages in memory.
+_PARSE_CACHE: "OrderedDict[bytes, _ParsedPage]" = OrderedDict()
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def _parse_page(html: str) -> _ParsedPage:
+    key = hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _PARSE_CACHE_LOCK:
+        hit = _PARSE_CACHE.get(key)
+        if hit is not None:
+            _PARSE_CACHE.move_to_end(key)
+            return hit
+
+    parsed = _parse_page_uncached(html)
+
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[key] = parsed
+        if len(_PARSE_CACHE) > PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+    return parsed
+
+
+def _leading_text(node, limit: int) -> str:
+    """
+    Whitespace-normalized visible text of node, read in document order only
+    until limit chars are collected instead of materializing the whole page.
+    """
+    parts = []
+    total = 0
+    for child in node.traverse(include_text=True):
+        if child.tag != "-text":
+            continue
+        piece = WHITESPACE_RE.sub(" ", child.text_content or "").strip()
+        if not piece:
+            continue
+        parts.append(piece)
+        total += len(piece) + 1
+        if total > limit:
+            break
+    return " ".join(parts)
+
+
+def _parse_page_uncached(html: str) -> _ParsedPage:
+    # extract raw candidates first
+    # finditer feeds the sets directly, no intermediate list of every match;
+    # the "@" probe is a C-speed scan that spares the regex on pages without one
+    raw_emails = {m.group(0) for m in EMAIL_RE.finditer(html)} if "@" in html else set()
+    raw_phones = {m.group(0) for m in PHONE_RE.finditer(html)}
+
+    # block / cookie-wall detection only matters when no contacts were found
+    if not (raw_emails or raw_phones):
+        signals = {m.group(0).lower() for m in BLOCK_SIGNAL_RE.finditer(html)}
+
+        # hard block detection
+        for kw in HARD_BLOCK_KEYWORDS:
+            if kw in signals:
+                return _ParsedPage(f"blocked_keyword:{kw}", [], [], (), "")
+
+        # cookie wall detection (soft)
+        cookie_hits = sum(1 for s in COOKIE_SIGNALS if s in signals)
+        if cookie_hits >= 2:
+            return _ParsedPage("cookie_wall", [], [], (), "")
+
+    # parse visible content, prefer main/article if present
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style", "noscript"])
+
+    main_content = tree.css_first("main, article") or tree.root
+    text = _leading_text(main_content, TEXT_SNIPPET_CHARS) if main_content else ""
+    text_snippet = text[:TEXT_SNIPPET_CHARS] if text else "unknown"
+
+    # important internal links, resolved against the final URL by the caller
+    hrefs = []
+    for a in tree.css("a[href]"):
+        href = (a.attributes.get("href") or "").strip()
+        href_l = href.lower()
+        if any(k in href_l for k in LINK_KEYWORDS):
+            hrefs.append(href)
+
+    # filter and normalize contacts
+    return _ParsedPage(
+        None,
+        _filter_emails(raw_emails),
+        _filter_phones(raw_phones),
+        tuple(hrefs),
+        text_snippet,
+    )
+
+
 # --------------------------------------------------
 # Function tool (agent-facing)
 # --------------------------------------------------
 @function_tool
-def enrich_website_contacts(url: str) -> dict:
+async def enrich_website_contacts(url: str) -> dict:
     """
     Deterministic website enrichment tool.
     Fetches once, extracts emails, phones, important links, and a short text snippet.
@@ -137,7 +412,7 @@ def enrich_website_contacts(url: str) -> dict:
     - No raw HTML returned
     - If blocked, returns explicit reason
     """
-    fetch_result = _fetch_html_raw(url)
+    fetch_result = await _fetch_html_raw(url)
     if not fetch_result.get("ok"):
         return {
             "ok": False,
@@ -147,50 +422,21 @@ def enrich_website_contacts(url: str) -> dict:
 
     html = fetch_result["html"]
     final_url = fetch_result["final_url"]
-    html_lower = html.lower()
-
-    # extract raw candidates first
-    raw_emails = set(EMAIL_RE.findall(html))
-    raw_phones = set(PHONE_RE.findall(html))
-
-    # hard block detection: only treat as hard block if no contacts found
-    for kw in HARD_BLOCK_KEYWORDS:
-        if kw in html_lower and not (raw_emails or raw_phones):
-            return {"ok": False, "reason": f"blocked_keyword:{kw}", "source_url": final_url}
 
-    # cookie wall detection (soft)
-    cookie_hits = sum(1 for s in COOKIE_SIGNALS if s in html_lower)
-    if cookie_hits >= 2 and not (raw_emails or raw_phones):
-        return {"ok": False, "reason": "cookie_wall", "source_url": final_url}
+    parsed = _parse_page(html)
+    if parsed.block_reason:
+        return {"ok": False, "reason": parsed.block_reason, "source_url": final_url}
 
-    # parse visible content, prefer main/article if present
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-
-    main_content = soup.find(["main", "article"]) or soup
-    text = " ".join(main_content.stripped_strings)
-    text = re.sub(r"\s+", " ", text).strip()
-    text_snippet = text[:800] if text else "unknown"
-
-    # important internal links expanded
-    link_keywords = [
-        "contact", "contact-us", "about", "impressum",
-        "team", "leadership", "press", "media", "career", "careers", "privacy", "terms"
-    ]
     links = set()
-    for a in soup.find_all("a", href=True):
-        href = a["href"].strip()
-        href_l = href.lower()
-        if any(k in href_l for k in link_keywords):
-            try:
-                links.add(urljoin(final_url, href))
-            except Exception:
-                continue
+    for href in parsed.hrefs:
+        try:
+            links.add(urljoin(final_url, href))
+        except Exception:
+            continue
 
-    # filter and normalize contacts
-    emails = _filter_emails(raw_emails)
-    phones = _filter_phones(raw_phones)
+    # copies, so callers never mutate a cached page
+    emails = list(parsed.emails)
+    phones = list(parsed.phones)
 
     return {
         "ok": True,
@@ -200,7 +446,7 @@ def enrich_website_contacts(url: str) -> dict:
         "email_count": len(emails),
         "phone_count": len(phones),
         "important_links": sorted(links),
-        "text_snippet": text_snippet,
+        "text_snippet": parsed.text_snippet,
         "has_email": bool(emails),
         "has_phone": bool(phones),
     }
@@ -1,13 +1,25 @@
 #!/usr/bin/env python3
 from pathlib import Path
-import json
+import orjson
 from typing import Any, Dict, List
-import pandas as pd
 import re
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
 
 FALLBACK_JSON = Path("outputs/lead_list_sorted.json")
 FALLBACK_XLSX = Path("outputs/final_leads_list.xlsx")
 
+PREFERRED_COLUMNS = [
+    "company",
+    "website",
+    "mail",
+    "phone_number",
+    "location",
+    "description",
+]
+
 # ============================================================
 # Excel-safe sanitization (HARD GUARANTEE)
 # ============================================================
@@ -18,13 +30,38 @@ def sanitize_for_excel(value: Any) -> Any:
     """
     Removes all characters that Excel / openpyxl cannot handle.
     Safe for strings, lists, dicts, numbers, None.
+    Lists and dicts are cleaned in place with an explicit stack, so deep
+    JSON costs no recursion.
     """
+    sub = _ILLEGAL_EXCEL_CHARS.sub
     if isinstance(value, str):
-        return _ILLEGAL_EXCEL_CHARS.sub("", value)
-    if isinstance(value, list):
-        return [sanitize_for_excel(v) for v in value]
-    if isinstance(value, dict):
-        return {k: sanitize_for_excel(v) for k, v in value.items()}
+        return sub("", value)
+
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            items = node.items()
+        elif isinstance(node, list):
+            items = enumerate(node)
+        else:
+            continue
+        for k, v in items:
+            if isinstance(v, str):
+                node[k] = sub("", v)
+            elif isinstance(v, (dict, list)):
+                stack.append(v)
+    return value
+
+
+def _excel_value(value: Any) -> Any:
+    """
+    Missing/NaN -> empty cell, containers -> their repr, scalars unchanged.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, (list, dict)):
+        return str(value)
     return value
 
 
@@ -47,8 +84,7 @@ def leads_json_to_excel_preserve(
 
     excel_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with input_path.open("r", encoding="utf-8") as f:
-        loaded = json.load(f)
+    loaded = orjson.loads(input_path.read_bytes())
 
     # 🔒 sanitize immediately after load
     loaded = sanitize_for_excel(loaded)
@@ -62,107 +98,83 @@ def leads_json_to_excel_preserve(
 
     items = [it if isinstance(it, dict) else {} for it in items]
 
+    # one pass settles the column set; the row loop below only fills values
     max_src = 0
+    all_keys = set(PREFERRED_COLUMNS)
     for it in items:
+        all_keys.update(it)
         v = it.get("source_urls", [])
         if isinstance(v, list):
             max_src = max(max_src, len(v))
 
-    rows = []
-    all_keys = set()
+    src_cols = [f"source_url_{i+1}" for i in range(max_src)]
+    all_keys.update(src_cols)
+    ordered = PREFERRED_COLUMNS + [k for k in sorted(all_keys) if k not in PREFERRED_COLUMNS]
 
-    for it in items:
-        row = dict(it)
+    defaults = dict.fromkeys(PREFERRED_COLUMNS, "")
+    src_positions = [ordered.index(col) for col in src_cols]
 
+    rows = []
+    for it in items:
         srcs = it.get("source_urls", [])
         if not isinstance(srcs, list):
             srcs = [] if srcs is None else [srcs]
 
-        for i in range(max_src):
-            col = f"source_url_{i+1}"
-            row[col] = srcs[i] if i < len(srcs) else ""
-            all_keys.add(col)
-
-        for k in ("company", "website", "mail", "phone_number", "location", "description"):
-            all_keys.add(k)
-            if k not in row:
-                row[k] = ""
-
-        for k in it.keys():
-            all_keys.add(k)
-
-        # 🔒 final row-level sanitation
-        rows.append(sanitize_for_excel(row))
-
-    preferred = [
-        "company",
-        "website",
-        "mail",
-        "phone_number",
-        "location",
-        "description",
-    ]
-    ordered = preferred + [k for k in sorted(all_keys) if k not in preferred]
-
-    df = pd.DataFrame(rows, columns=ordered)
-
-    # 🔒 sanitize dataframe values one last time
-    df = df.applymap(sanitize_for_excel)
-
-    df.to_excel(excel_path, index=False, engine="openpyxl")
-
-    try:
-        from openpyxl import load_workbook
-        from openpyxl.utils import get_column_letter
-
-        wb = load_workbook(excel_path)
-        ws = wb.active
-
-        headers = {
-            ws.cell(row=1, column=i).value: i
-            for i in range(1, ws.max_column + 1)
-        }
-
-        def set_hyperlink(row_idx: int, col_idx: int):
-            cell = ws.cell(row=row_idx, column=col_idx)
-            if isinstance(cell.value, str):
-                v = cell.value
-                if v.startswith("http://") or v.startswith("https://"):
-                    cell.hyperlink = v
-                    cell.style = "Hyperlink"
-            cell.number_format = "@"
-
-        for r in range(2, ws.max_row + 1):
-            if "website" in headers:
-                set_hyperlink(r, headers["website"])
-
-            if "phone_number" in headers:
-                c = ws.cell(row=r, column=headers["phone_number"])
-                if c.value is not None:
-                    c.value = str(c.value)
-                c.number_format = "@"
-
-            if "mail" in headers:
-                c = ws.cell(row=r, column=headers["mail"])
-                if c.value is not None:
-                    c.value = str(c.value)
-                c.number_format = "@"
-
-            for i in range(1, max_src + 1):
-                colname = f"source_url_{i}"
-                if colname in headers:
-                    set_hyperlink(r, headers[colname])
-
-        for col in range(1, ws.max_column + 1):
-            col_letter = get_column_letter(col)
-            max_len = 0
-            for cell in ws[col_letter]:
-                if cell.value:
-                    max_len = max(max_len, len(str(cell.value)))
-            ws.column_dimensions[col_letter].width = min(80, max(10, max_len + 2))
-
-        wb.save(excel_path)
-    except Exception:
-        pass
+        row = [it.get(k, defaults.get(k)) for k in ordered]
+        # pad once per row instead of bounds-checking every source column
+        padded = srcs + [""] * (max_src - len(srcs))
+        for j, url in zip(src_positions, padded):
+            row[j] = url
+
+        # values come from the tree sanitized right after load
+        rows.append(row)
+
+    url_cols = {ordered.index("website"), *src_positions}
+    text_cols = {ordered.index("mail"), ordered.index("phone_number")}
+
+    # Values and column widths are settled up front: a write-only sheet
+    # streams rows to disk, so widths must be known before the first row.
+    widths = [len(k) for k in ordered]
+    table = []
+    for row in rows:
+        out = [_excel_value(v) for v in row]
+        for j in text_cols:
+            if out[j] is not None:
+                out[j] = str(out[j])
+        for j, v in enumerate(out):
+            if v:
+                widths[j] = max(widths[j], len(str(v)))
+        table.append(out)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+
+    for j, w in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(j)].width = min(80, max(10, w + 2))
+
+    header_font = Font(bold=True)
+    header = []
+    for k in ordered:
+        c = WriteOnlyCell(ws, value=k)
+        c.font = header_font
+        header.append(c)
+    ws.append(header)
+
+    # hyperlinks and text formats are applied on the first (only) write
+    for out in table:
+        cells = []
+        for j, v in enumerate(out):
+            if j not in url_cols and j not in text_cols:
+                cells.append(v)
+                continue
+            c = WriteOnlyCell(ws, value=v)
+            if j in url_cols and isinstance(v, str) and v.startswith(("http://", "https://")):
+                c.hyperlink = v
+                c.style = "Hyperlink"
+            c.number_format = "@"
+            cells.append(c)
+        ws.append(cells)
+
+    wb.save(excel_path)
 
     print(f"Final Excel written to {excel_path}")
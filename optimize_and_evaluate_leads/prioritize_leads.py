@@ -1,19 +1,15 @@
-def sort_leads(leads: list[dict]) -> list[dict]:
-    def rank(lead: dict) -> int:
-        mail = str(lead.get("mail") or "").strip().lower()
-        phone = str(lead.get("phone_number") or "").strip().lower()
-
-        invalid_values = ("unknown", "", "none", "n/a")
+_INVALID_VALUES = frozenset(("unknown", "", "none", "n/a"))
 
-        has_mail = mail not in invalid_values
-        has_phone = phone not in invalid_values
 
-        if has_mail and has_phone:
-            return 0
-        if has_mail:
-            return 1
-        if has_phone:
-            return 2
-        return 3
+def sort_leads(leads: list[dict]) -> list[dict]:
+    def rank(lead: dict) -> int:
+        # empty cells (None / "") bail out before any string work
+        mail = lead.get("mail")
+        has_mail = bool(mail) and str(mail).strip().lower() not in _INVALID_VALUES
+        phone = lead.get("phone_number")
+        has_phone = bool(phone) and str(phone).strip().lower() not in _INVALID_VALUES
+
+        # 0: mail + phone, 1: mail only, 2: phone only, 3: neither
+        return 2 * (not has_mail) + (not has_phone)
 
     return sorted(leads, key=rank)
@@ -1,12 +1,157 @@
-import json
 import asyncio
+import weakref
+import orjson
 from pathlib import Path
-from agents import Runner, trace
-from optimize_and_evaluate_leads.enrichment_agent import create_enrichment_agent
-from contextlib import AsyncExitStack
+from agents import Agent, Runner, trace
+from optimize_and_evaluate_leads.enrichment_agent import (
+    EnrichmentOutput,
+    Lead,
+    create_enrichment_agent,
+    fetch_only_mcp_servers,
+)
+from optimize_and_evaluate_leads.enrichment_tools import close_http_client
+from contextlib import AsyncExitStack, suppress
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+from pydantic import ValidationError
 from utils.logger import logging
 logger = logging.getLogger(__name__)
 
+ENRICHMENT_BATCH_SIZE = 10
+MAX_CONCURRENT_BATCHES = 4
+
+# Sites the enrichment tool never fetches (matches the agent instructions)
+SKIP_HOSTS = frozenset({"linkedin.com", "facebook.com"})
+_SKIP_HOST_SUFFIXES = tuple("." + h for h in SKIP_HOSTS)
+_MISSING = frozenset({"", "unknown"})
+
+
+def _is_missing(value) -> bool:
+    return value is None or value in _MISSING
+
+
+@lru_cache(maxsize=4096)
+def _host(url: str) -> str:
+    parts = urlparse(url if "//" in url else "//" + url)
+    return parts.netloc.lower().removeprefix("www.")
+
+
+def _needs_enrichment(lead: Dict) -> bool:
+    website = lead.get("website")
+    if not isinstance(website, str) or website in _MISSING:
+        return False
+
+    host = _host(website)
+    if host in SKIP_HOSTS or host.endswith(_SKIP_HOST_SUFFIXES):
+        return False
+
+    return _is_missing(lead.get("mail")) or _is_missing(lead.get("phone_number"))
+
+
+def preprocess_leads(
+    leads: List[Dict],
+) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, Lead]]]:
+    """
+    Split leads into those worth sending to the enrichment agent and those
+    the agent would skip anyway (no usable website, LinkedIn/Facebook URL,
+    or mail and phone already present). Skipped leads are passed through.
+    Both lists carry each lead's input index so the output keeps input order.
+    """
+    fetchable: List[Tuple[int, Dict]] = []
+    skipped: List[Tuple[int, Lead]] = []
+
+    for idx, lead in enumerate(leads):
+        if _needs_enrichment(lead):
+            fetchable.append((idx, lead))
+            continue
+        try:
+            skipped.append((idx, Lead.model_validate(lead)))
+        except ValidationError:
+            # let the agent repair leads that do not fit the schema
+            fetchable.append((idx, lead))
+
+    return fetchable, skipped
+
+
+class _AgentSession:
+    """
+    Enrichment agent plus its connected MCP servers for one event loop.
+    A background task owns the server contexts, so they are entered and
+    exited in the same task as the MCP stdio client requires.
+    """
+
+    def __init__(self) -> None:
+        self.agent = create_enrichment_agent(mcp_servers=fetch_only_mcp_servers())
+        self.connected = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._hold_servers())
+
+    async def _hold_servers(self) -> None:
+        try:
+            async with AsyncExitStack() as stack:
+                for server in self.agent.mcp_servers:
+                    await stack.enter_async_context(server)
+                self.connected.set_result(None)
+                await self._stop.wait()
+        except asyncio.CancelledError:
+            self.connected.cancel()
+            raise
+        except Exception as e:
+            if not self.connected.done():
+                self.connected.set_exception(e)
+            else:
+                logger.warning("Enrichment MCP server shutdown failed: %s", e)
+        finally:
+            # servers are gone (stopped or died): the next caller rebuilds
+            loop = asyncio.get_running_loop()
+            if _AGENT_SESSIONS.get(loop) is self:
+                del _AGENT_SESSIONS[loop]
+
+    @property
+    def alive(self) -> bool:
+        return not self._task.done()
+
+    async def close(self) -> None:
+        self._stop.set()
+        with suppress(Exception, asyncio.CancelledError):
+            await self._task
+
+
+_AGENT_SESSIONS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AgentSession]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def get_enrichment_agent() -> Agent:
+    """
+    The current loop's enrichment agent, built and connected on first use.
+    Concurrent callers share the same connection attempt.
+    """
+    loop = asyncio.get_running_loop()
+    session = _AGENT_SESSIONS.get(loop)
+    if session is None or not session.alive:
+        session = _AGENT_SESSIONS[loop] = _AgentSession()
+
+    try:
+        await asyncio.shield(session.connected)
+    except Exception:
+        # drop the failed session so the next call reconnects
+        if _AGENT_SESSIONS.get(loop) is session:
+            del _AGENT_SESSIONS[loop]
+        raise
+    return session.agent
+
+
+async def shutdown_enrichment_agent() -> None:
+    """
+    Disconnect the current loop's enrichment agent. Safe to call repeatedly.
+    """
+    session = _AGENT_SESSIONS.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
 
 async def run_lead_enrichment(
     input_json_path: str,
@@ -18,36 +163,65 @@ async def run_lead_enrichment(
     if not input_path.exists():
         raise FileNotFoundError(f"Input JSON not found: {input_path}")
 
-    with input_path.open("r", encoding="utf-8") as f:
-        input_data = json.load(f)
-
-    agent = create_enrichment_agent()
+    input_data = orjson.loads(input_path.read_bytes())
 
-    async with AsyncExitStack() as stack:
-        if agent.mcp_servers:
-            for server in agent.mcp_servers:
-                await stack.enter_async_context(server)
-
-        with trace("lead_enrichment_agent"):
-            logger.info("Sending leads JSON to enrichment model...")
-            input_message = json.dumps(input_data, indent=2)
+    leads: List[Dict] = input_data.get("leads", []) if isinstance(input_data, dict) else input_data
+    fetchable, skipped = preprocess_leads(leads)
+    batches = [
+        fetchable[i:i + ENRICHMENT_BATCH_SIZE]
+        for i in range(0, len(fetchable), ENRICHMENT_BATCH_SIZE)
+    ]
 
+    async def run_batch(agent: Agent, batch: List[Tuple[int, Dict]]) -> List[Lead]:
+        async with batch_sem:
+            # Compact: indentation is only extra prompt tokens for the model
+            input_message = orjson.dumps({"leads": [lead for _, lead in batch]}).decode()
             result = await Runner.run(
                 agent,
                 [{"role": "user", "content": input_message}],
-                max_turns=200
+                max_turns=100
             )
+            return result.final_output.leads
 
-        enriched_output = result.final_output
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+    results: List[List[Lead]] = []
+    if batches:
+        agent = await get_enrichment_agent()
+        batch_sem = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
 
-        with output_path.open("w", encoding="utf-8") as f:
-            json.dump(
-                enriched_output.model_dump(),
-                f,
-                indent=2,
-                ensure_ascii=False,
+        # Website fetches share the loop's pooled client. It is not closed here:
+        # other runs on a long-lived loop may still be using it.
+        with trace("lead_enrichment_agent"):
+            logger.info(
+                "Sending %d leads to enrichment model in %d batches (%d skipped)...",
+                len(fetchable), len(batches), len(skipped),
             )
+            # Batches overlap their LLM round trips instead of queuing behind each other
+            results = await asyncio.gather(*[run_batch(agent, b) for b in batches])
+    else:
+        logger.info("No leads need enrichment (%d skipped)", len(skipped))
+
+    # Put every lead back at its input position. A batch the model returned
+    # with a different lead count is kept together at its first lead's slot.
+    placed: List[Tuple[int, Lead]] = list(skipped)
+    for batch, batch_leads in zip(batches, results):
+        idxs = [idx for idx, _ in batch]
+        if len(batch_leads) == len(idxs):
+            placed.extend(zip(idxs, batch_leads))
+        else:
+            placed.extend((idxs[0], lead) for lead in batch_leads)
+    placed.sort(key=itemgetter(0))  # stable: a kept-together batch stays in order
+
+    # The SDK already validated each batch from the raw model JSON
+    # (TypeAdapter.validate_json), so merge without re-validating and
+    # serialize straight from the models without a dict round trip.
+    enriched_output = EnrichmentOutput.model_construct(
+        leads=[lead for _, lead in placed]
+    )
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(
+        enriched_output.model_dump_json(indent=2),
+        encoding="utf-8",
+    )
 
     logger.info(f"############## Enriched output saved to {output_path} ##################")
 
@@ -58,11 +232,16 @@ if __name__ == "__main__":
 
     logger.info("Starting lead enrichment run...")
 
-    asyncio.run(
-        run_lead_enrichment(
-            input_json_path=input_json,
-            output_json_path=output_json,
-        )
-    )
+    async def _main() -> None:
+        try:
+            await run_lead_enrichment(
+                input_json_path=input_json,
+                output_json_path=output_json,
+            )
+        finally:
+            await close_http_client()
+            await shutdown_enrichment_agent()
+
+    asyncio.run(_main())
 
     logger.info("Lead enrichment run completed.")
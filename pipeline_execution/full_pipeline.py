@@ -11,16 +11,29 @@ Responsibilities:
 """
 
 import asyncio
-import json
 import os
 import time
 import tempfile
 import shutil
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Callable, Union
+from typing import Dict, Iterable, List, Optional, Any, Callable, Union
 from dataclasses import dataclass, asdict
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import orjson
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import uvloop
+except ImportError:  # Windows / not installed
+    uvloop = None
 
 from utils.logger import logging
 from utils.exception import CustomException
@@ -30,7 +43,12 @@ from multiple_source_lead_search.leads_research_pipeline import run_all_agents_s
 from optimize_and_evaluate_leads.deduplication import dedupe_company_name
 from optimize_and_evaluate_leads.prioritize_leads import sort_leads
 from optimize_and_evaluate_leads.json_to_excel import leads_json_to_excel_preserve
-from optimize_and_evaluate_leads.run_enrichment import run_lead_enrichment
+from optimize_and_evaluate_leads.run_enrichment import (
+    run_lead_enrichment,
+    get_enrichment_agent,
+    shutdown_enrichment_agent,
+)
+from optimize_and_evaluate_leads.enrichment_tools import close_http_client
 
 
 logger = logging.getLogger(__name__)
@@ -56,6 +74,8 @@ class PipelineConfig:
     max_retries: int = 3
     retry_delay: int = 5
     query_timeout: int = 300
+    max_parallel_queries: int = 4
+    finalize_parallel: bool = False
 
     cancellation_token: Optional[threading.Event] = None
     progress_callback: Optional[Callable[[str, dict], None]] = None
@@ -82,14 +102,44 @@ def load_json(path: PathOrStr) -> Any:
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(path)
-    with p.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    return orjson.loads(p.read_bytes())
+
 
+# Linux FICLONE ioctl: copy-on-write clone on Btrfs/XFS, no data copied
+_FICLONE = 0x40049409
+# below this size fsync is cheap enough to always pay
+_FSYNC_MAX_BYTES = 1 << 20
 
-def write_json_atomic(data: Any, path: PathOrStr, make_backup: bool = True) -> None:
+
+def _clone_file(src: Path, dst: Path) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def write_json_atomic(
+    data: Any,
+    path: PathOrStr,
+    make_backup: bool = True,
+    durable: Optional[bool] = None,
+) -> None:
+    """
+    durable: True always fsyncs, False never does (rename keeps the swap
+    atomic; only crash durability is traded), None fsyncs payloads < 1 MB.
+    """
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
 
+    # serialize up front: one bytes payload, and a failure leaves no temp file
+    payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
     if make_backup and p.exists():
         try:
             backup = p.with_suffix(p.suffix + ".bak")
@@ -98,14 +148,52 @@ def write_json_atomic(data: Any, path: PathOrStr, make_backup: bool = True) -> N
             try:
                 os.link(p, backup)
             except OSError:
-                shutil.copy2(p, backup)
+                if not _clone_file(p, backup):
+                    shutil.copy2(p, backup)
         except Exception:
             logger.debug("Backup failed for %s", p, exc_info=True)
 
     fd, tmp = tempfile.mkstemp(dir=str(p.parent), prefix=".tmp_", suffix=".json")
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # unbuffered: the payload goes straight to write(2), no extra copy
+        with os.fdopen(fd, "wb", buffering=0) as f:
+            view = memoryview(payload)
+            while view:
+                view = view[f.write(view):]
+            if durable is None:
+                durable = len(payload) < _FSYNC_MAX_BYTES
+            if durable:
+                try:
+                    os.fsync(f.fileno())
+                except Exception:
+                    pass
+        Path(tmp).replace(p)
+    finally:
+        try:
+            Path(tmp).unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
+def merge_leads_atomic(parts: Iterable[PathOrStr], path: PathOrStr) -> int:
+    """
+    Stream the leads of each part file into a single {"leads": [...]} file,
+    holding one part in memory at a time. Returns the number of leads written.
+    """
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+
+    count = 0
+    fd, tmp = tempfile.mkstemp(dir=str(p.parent), prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b'{"leads": [')
+            for part in parts:
+                for lead in normalize_leads(load_json(part)):
+                    f.write(b",\n" if count else b"\n")
+                    f.write(orjson.dumps(lead, option=orjson.OPT_NON_STR_KEYS))
+                    count += 1
+            f.write(b"\n]}" if count else b"]}")
             f.flush()
             try:
                 os.fsync(f.fileno())
@@ -117,6 +205,7 @@ def write_json_atomic(data: Any, path: PathOrStr, make_backup: bool = True) -> N
             Path(tmp).unlink(missing_ok=True)
         except Exception:
             pass
+    return count
 
 
 def normalize_leads(obj: Any) -> List[Dict]:
@@ -125,11 +214,33 @@ def normalize_leads(obj: Any) -> List[Dict]:
     return obj if isinstance(obj, list) else []
 
 
+# Stage boundaries re-read the file the previous stage just wrote (enrichment
+# counts the enriched leads, sorting reads them again); keyed by stat so any
+# rewrite of the file is a miss.
+_LEAD_CACHE: Dict[tuple, List[Dict]] = {}
+_LEAD_CACHE_MAX = 4
+_LEAD_CACHE_LOCK = threading.Lock()
+
+
 def safe_load_leads(path: PathOrStr) -> List[Dict]:
     try:
-        if not Path(path).exists():
+        p = Path(path)
+        if not p.exists():
             return []
-        return normalize_leads(load_json(path))
+
+        st = p.stat()
+        key = (str(p.resolve()), st.st_mtime_ns, st.st_size)
+        with _LEAD_CACHE_LOCK:
+            hit = _LEAD_CACHE.get(key)
+        if hit is not None:
+            return list(hit)
+
+        leads = normalize_leads(load_json(p))
+        with _LEAD_CACHE_LOCK:
+            _LEAD_CACHE[key] = leads
+            while len(_LEAD_CACHE) > _LEAD_CACHE_MAX:
+                _LEAD_CACHE.pop(next(iter(_LEAD_CACHE)))
+        return list(leads)
     except Exception:
         logger.warning("Failed to load leads from %s", path, exc_info=True)
         return []
@@ -172,17 +283,119 @@ def _progress(cfg: PipelineConfig, event: str, payload: Optional[dict] = None):
 # Async intake safety
 # ---------------------------------------------------------------------
 
-_async_executor = ThreadPoolExecutor(max_workers=2)
+# One long-lived loop on a daemon thread: the HTTP client pool and the
+# enrichment agent (with its MCP servers) survive across stages and runs
+# instead of dying with a fresh asyncio.run() per call.
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_loop_lock = threading.Lock()
+
+
+def _get_async_loop() -> asyncio.AbstractEventLoop:
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None or _async_loop.is_closed():
+            loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="pipeline-async-loop", daemon=True
+            ).start()
+            _async_loop = loop
+        return _async_loop
+
 
 def run_async_safely(coro):
     if not asyncio.iscoroutine(coro):
         raise TypeError("Expected coroutine")
+
+    loop = _get_async_loop()
     try:
-        asyncio.get_running_loop()
+        running = asyncio.get_running_loop()
     except RuntimeError:
-        return asyncio.run(coro)
-    else:
-        return _async_executor.submit(asyncio.run, coro).result()
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_async_safely cannot block on its own event loop")
+
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def shutdown_async_loop(timeout: float = 30) -> None:
+    """
+    Release loop-bound resources (HTTP client, enrichment agent) and stop the loop.
+    """
+    global _async_loop
+    with _async_loop_lock:
+        loop, _async_loop = _async_loop, None
+    if loop is None or loop.is_closed():
+        return
+
+    async def _release():
+        await close_http_client()
+        await shutdown_enrichment_agent()
+
+    try:
+        asyncio.run_coroutine_threadsafe(_release(), loop).result(timeout)
+    except Exception:
+        logger.warning("Async loop cleanup failed", exc_info=True)
+    loop.call_soon_threadsafe(loop.stop)
+
+# ---------------------------------------------------------------------
+# CPU-bound offload
+# ---------------------------------------------------------------------
+
+# Lazily started, and via forkserver/spawn: forking this process (pipeline
+# loop and executor threads alive) is not safe. Only path-in/path-out
+# functions go here; cfg/metrics (Events, callbacks) do not pickle.
+CPU_POOL_WORKERS = min(4, os.cpu_count() or 1)
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+_cpu_pool_lock = threading.Lock()
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            _cpu_pool = ProcessPoolExecutor(
+                max_workers=CPU_POOL_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _cpu_pool
+
+
+def _discard_cpu_pool(pool: ProcessPoolExecutor) -> None:
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is pool:
+            _cpu_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_cpu_bound(fn: Callable, *args) -> Any:
+    """
+    Run a picklable, path-driven function in the shared process pool.
+    A broken pool (worker died) is replaced and the call retried once;
+    if the fresh pool breaks too, the function runs on this thread.
+    """
+    for _ in range(2):
+        pool = _get_cpu_pool()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            logger.warning("CPU process pool broken; replacing it", exc_info=True)
+            _discard_cpu_pool(pool)
+    return fn(*args)
+
+
+def shutdown_cpu_pool() -> None:
+    global _cpu_pool
+    with _cpu_pool_lock:
+        pool, _cpu_pool = _cpu_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
 
 # ---------------------------------------------------------------------
 # Retry helper
@@ -256,7 +469,7 @@ def run_research_from_queries(cfg: PipelineConfig, metrics: PipelineMetrics, run
     parts_dir = run_dir / "consolidated_parts"
     parts_dir.mkdir(parents=True, exist_ok=True)
 
-    for idx, query in enumerate(queries, start=1):
+    def _run_query(idx: int, query: str):
         _check_cancel(cfg)
 
         logger.info(
@@ -274,37 +487,53 @@ def run_research_from_queries(cfg: PipelineConfig, metrics: PipelineMetrics, run
             cfg=cfg
         )
 
-        duration = round(time.time() - start_ts, 2)
-
-        if ok:
-            metrics.successful_queries += 1
-            logger.info(
-                "########## QUERY SUCCESS ########## | %d/%d | time=%.2fs",
-                idx, total_queries, duration
-            )
-        else:
-            metrics.failed_queries += 1
-            logger.error(
-                "########## QUERY FAILED ########## | %d/%d | time=%.2fs",
-                idx, total_queries, duration
-            )
+        return ok, round(time.time() - start_ts, 2)
 
-        _progress(cfg, "query_done", {
-            "idx": idx,
-            "total": total_queries,
-            "success": ok,
-            "duration_sec": duration
-        })
+    # Queries are I/O-bound agent runs, each in its own event loop; overlap a
+    # bounded number of them. Metrics/progress stay on this thread.
+    workers = max(1, min(cfg.max_parallel_queries, total_queries))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="research") as pool:
+        futures = {
+            pool.submit(_run_query, idx, query): idx
+            for idx, query in enumerate(queries, start=1)
+        }
+        try:
+            for future in as_completed(futures):
+                idx = futures[future]
+                ok, duration = future.result()
+
+                if ok:
+                    metrics.successful_queries += 1
+                    logger.info(
+                        "########## QUERY SUCCESS ########## | %d/%d | time=%.2fs",
+                        idx, total_queries, duration
+                    )
+                else:
+                    metrics.failed_queries += 1
+                    logger.error(
+                        "########## QUERY FAILED ########## | %d/%d | time=%.2fs",
+                        idx, total_queries, duration
+                    )
+
+                _progress(cfg, "query_done", {
+                    "idx": idx,
+                    "total": total_queries,
+                    "success": ok,
+                    "duration_sec": duration
+                })
+        except BaseException:
+            # cancellation (or any failure) stops queries that have not started
+            for f in futures:
+                f.cancel()
+            raise
 
     # Merge results
     logger.info("########## MERGING QUERY RESULTS ##########")
 
-    leads: List[Dict] = []
-    for part in sorted(parts_dir.glob("consolidated_part_*.json")):
-        leads.extend(normalize_leads(load_json(part)))
-
-    write_json_atomic({"leads": leads}, cfg.consolidated_path, make_backup=False)
-    metrics.total_leads_found = len(leads)
+    metrics.total_leads_found = merge_leads_atomic(
+        sorted(parts_dir.glob("consolidated_part_*.json")),
+        cfg.consolidated_path,
+    )
 
     logger.info(
         "########## RESEARCH STAGE COMPLETED ########## | "
@@ -343,6 +572,15 @@ def run_deduplication(cfg: PipelineConfig, metrics: PipelineMetrics):
     })
 
 
+def warm_enrichment_agent() -> None:
+    """Bring up the enrichment agent's MCP servers ahead of the enrichment stage."""
+    try:
+        run_async_safely(get_enrichment_agent())
+    except Exception:
+        # the stage connects again on its own; warm-up is best effort
+        logger.warning("Enrichment agent warm-up failed", exc_info=True)
+
+
 def run_enrichment_stage(cfg: PipelineConfig, metrics: PipelineMetrics):
     _check_cancel(cfg)
 
@@ -403,7 +641,8 @@ def run_export_to_excel(cfg: PipelineConfig, metrics: PipelineMetrics):
     logger.info("########## EXCEL EXPORT STARTED ##########")
     _progress(cfg, "stage_start", {"stage": "export"})
 
-    leads_json_to_excel_preserve(cfg.sorted_path, cfg.excel_out_path)
+    # openpyxl serialization is pure CPU; keep it off the GIL the API shares
+    run_cpu_bound(leads_json_to_excel_preserve, cfg.sorted_path, cfg.excel_out_path)
 
     if not Path(cfg.excel_out_path).exists():
         logger.error("########## EXCEL EXPORT FAILED ##########")
@@ -6,9 +6,11 @@ import inspect
 import time
 from pathlib import Path
 from typing import Dict, Any, Optional, Callable
+from dataclasses import dataclass
 import threading
 
-from utils.send_excel_on_email import send_lead_notification
+from utils.send_excel_on_email import send_lead_notification_async
+from utils.exception import CustomException
 
 # =========================
 # Engine imports (pipeline primitives)
@@ -22,7 +24,9 @@ from pipeline_execution.full_pipeline import (
     run_sorting,
     run_export_to_excel,
     write_json_atomic,
-    run_enrichment_stage
+    run_enrichment_stage,
+    warm_enrichment_agent,
+    CPU_POOL_WORKERS,
 )
 
 # =========================
@@ -35,10 +39,40 @@ logging.basicConfig(level=logging.INFO)
 # Global shared state
 # =========================
 RUNS: Dict[str, Dict[str, Any]] = {}
-_RUNS_LOCK = asyncio.Lock()
 
+# per-run locks: only check-then-act on a single run needs serializing,
+# so unrelated runs never contend. Plain RUNS reads/inserts are atomic.
+# Locks live only while a run is active; finished runs get a throwaway one.
+_run_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _run_finished(meta: Optional[Dict[str, Any]]) -> bool:
+    return (
+        meta is None
+        or meta.get("phase") == "done"
+        or meta.get("status") in ("intake_failed", "finalize_failed", "cancelling")
+    )
+
+
+def _lock_for(run_id: str) -> asyncio.Lock:
+    lock = _run_locks.get(run_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        if not _run_finished(RUNS.get(run_id)):
+            _run_locks[run_id] = lock
+    return lock
+
+
+def release_run_lock(run_id: str) -> None:
+    """Forget a run's lock once nothing will check-then-act on it again."""
+    _run_locks.pop(run_id, None)
+
+# per-stage limits, each sized to what that stage actually contends on
 MAX_CONCURRENT_RUNS = 5
-_PIPELINE_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+_INTAKE_SEM = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+_RESEARCH_SEM = asyncio.Semaphore(MAX_CONCURRENT_RUNS)  # LLM / MCP bound
+_FINALIZE_SEM = asyncio.Semaphore(os.cpu_count() or 1)
+_EXPORT_SEM = asyncio.Semaphore(CPU_POOL_WORKERS)  # one per process-pool worker
 
 # =========================
 # Helpers (internal)
@@ -68,20 +102,20 @@ def _maybe_awaitable_call(fn: Callable, /, *args, **kwargs):
 
 
 async def _safe_get_run(run_id: str) -> Optional[Dict[str, Any]]:
-    async with _RUNS_LOCK:
-        return dict(RUNS.get(run_id)) if run_id in RUNS else None
+    meta = RUNS.get(run_id)
+    return dict(meta) if meta is not None else None
 
 
 async def safe_update_run(run_id: str, **kwargs) -> None:
-    async with _RUNS_LOCK:
+    async with _lock_for(run_id):
         if run_id in RUNS:
             RUNS[run_id].update(kwargs)
 
 # =========================
 # Progress writer
 # =========================
-def _write_progress_sync(run_dir: str, stage: str, info: dict) -> None:
-    out = Path(run_dir) / "outputs"
+def _write_progress_sync(run_dir: Path, stage: str, info: dict) -> None:
+    out = run_dir / "outputs"
     out.mkdir(parents=True, exist_ok=True)
     write_json_atomic(
         {"stage": stage, "info": info},
@@ -90,15 +124,180 @@ def _write_progress_sync(run_dir: str, stage: str, info: dict) -> None:
     )
 
 
-async def _write_progress(run_dir: str, stage: str, info: dict) -> None:
-    await asyncio.to_thread(_write_progress_sync, run_dir, stage, info)
+# progress writes are buffered in memory and flushed by a background task;
+# a later write for the same (run_dir, stage) supersedes a pending one
+PROGRESS_FLUSH_INTERVAL_S = 0.25
+_progress_buf: Dict[tuple, dict] = {}
+_progress_flusher_task: Optional[asyncio.Task] = None
+
+
+def _flush_progress_sync(pending: Dict[tuple, dict]) -> None:
+    for (run_dir, stage), info in pending.items():
+        try:
+            _write_progress_sync(run_dir, stage, info)
+        except Exception:
+            logger.exception("Progress write failed [%s/%s]", run_dir, stage)
+
+
+async def _flush_progress() -> None:
+    global _progress_buf
+    if not _progress_buf:
+        return
+    pending, _progress_buf = _progress_buf, {}
+    await asyncio.to_thread(_flush_progress_sync, pending)
+
+
+async def _progress_flusher() -> None:
+    while True:
+        await asyncio.sleep(PROGRESS_FLUSH_INTERVAL_S)
+        await _flush_progress()
+
+
+def start_progress_flusher() -> None:
+    """Start the progress flusher on the running loop (app startup)."""
+    global _progress_flusher_task
+    if _progress_flusher_task is None or _progress_flusher_task.done():
+        _progress_flusher_task = asyncio.create_task(_progress_flusher())
+
+
+async def stop_progress_flusher() -> None:
+    """Stop the flusher and write out anything still buffered."""
+    global _progress_flusher_task
+    task, _progress_flusher_task = _progress_flusher_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await _flush_progress()
+
+
+async def _write_progress(run_dir: Path, stage: str, info: dict) -> None:
+    if _progress_flusher_task is None:
+        # no flusher (e.g. outside the API): write through
+        await asyncio.to_thread(_write_progress_sync, run_dir, stage, info)
+        return
+    _progress_buf[(run_dir, stage)] = info
+
+
+async def _transition(run_id: str, stage: str, progress: str, **fields) -> None:
+    """Apply a stage transition: one RUNS update + one progress file write."""
+    async with _lock_for(run_id):
+        meta = RUNS.get(run_id)
+        if meta is None:
+            return
+        meta.update(fields)
+        run_dir = meta["run_dir_path"]
+    await _write_progress(run_dir, stage, {"status": progress})
+
+# =========================
+# Email flush worker
+# =========================
+EMAIL_QUEUE_MAXSIZE = 10_000
+
+
+@dataclass
+class EmailJob:
+    run_id: str
+    recipient: str
+    excel_path: str
+    # resolved once the send has been attempted (or the job dropped);
+    # failed with CustomException if the worker stops before sending it
+    done: Optional[asyncio.Future] = None
+
+
+def _resolve_job(job: EmailJob) -> None:
+    if job.done is not None and not job.done.done():
+        job.done.set_result(None)
+
+
+def _fail_job(job: EmailJob, reason: str) -> None:
+    if job.done is not None and not job.done.done():
+        job.done.set_exception(CustomException(reason))
+
+
+_email_queue: Optional["asyncio.Queue[EmailJob]"] = None
+_email_worker_task: Optional[asyncio.Task] = None
+
+
+async def _send_email_job(job: EmailJob) -> None:
+    try:
+        logger.info("########## EMAIL SENDING ########## [run=%s]", job.run_id)
+        if not await send_lead_notification_async(job.recipient, job.excel_path):
+            raise RuntimeError("Email could not be sent")
+        await safe_update_run(job.run_id, email_sent=True, email_sent_to=job.recipient)
+        logger.info("########## EMAIL SENT ########## [run=%s]", job.run_id)
+    except Exception as email_error:
+        logger.exception("########## EMAIL FAILED ########## [run=%s]", job.run_id)
+        await safe_update_run(job.run_id, email_error=str(email_error))
+    _resolve_job(job)
+
+
+async def _email_worker(queue: "asyncio.Queue[EmailJob]") -> None:
+    # jobs go out as soon as they are dequeued; the pooled SMTP session
+    # already spans consecutive sends, so holding jobs back gains nothing
+    while True:
+        job = await queue.get()
+        try:
+            await _send_email_job(job)
+        finally:
+            # cancelled mid-send: the finalizer must not wait forever
+            _fail_job(job, "Email worker stopped before the email was sent")
+            queue.task_done()
+
+
+def start_email_worker() -> None:
+    """Start the email flush worker on the running loop (app startup)."""
+    global _email_queue, _email_worker_task
+    if _email_worker_task is not None and not _email_worker_task.done():
+        return
+    _email_queue = asyncio.Queue(maxsize=EMAIL_QUEUE_MAXSIZE)
+    _email_worker_task = asyncio.create_task(_email_worker(_email_queue))
+
+
+async def stop_email_worker(timeout: float = 30.0) -> None:
+    """Flush queued emails (bounded by timeout), then stop the worker."""
+    global _email_queue, _email_worker_task
+    queue, task = _email_queue, _email_worker_task
+    _email_queue, _email_worker_task = None, None
+    if task is None:
+        return
+    try:
+        await asyncio.wait_for(queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Email queue not drained at shutdown (%d pending)", queue.qsize())
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    # release finalizers still waiting on jobs that will never be sent
+    while not queue.empty():
+        job = queue.get_nowait()
+        _fail_job(job, "Shutdown before email was sent")
+        queue.task_done()
+
+
+async def _enqueue_email(job: EmailJob) -> None:
+    if _email_queue is None:
+        # no worker (e.g. outside the API): send inline
+        await _send_email_job(job)
+        return
+    try:
+        _email_queue.put_nowait(job)
+        logger.info("########## EMAIL QUEUED ########## [run=%s]", job.run_id)
+    except asyncio.QueueFull:
+        logger.error("Email queue full, dropping email [run=%s]", job.run_id)
+        await safe_update_run(job.run_id, email_error="Email queue full")
+        _resolve_job(job)
 
 # =========================
 # Run creation
 # =========================
 def create_run_records(user_input_filename: str) -> Dict[str, Any]:
     run_dir = _make_run_folder()
-    (Path(run_dir) / ".pipeline.lock").write_text(str(os.getpid()))
+    (run_dir / ".pipeline.lock").write_text(str(os.getpid()))
 
     cfg = PipelineConfig(
         user_input_path=str(run_dir / "inputs" / user_input_filename),
@@ -118,6 +317,7 @@ def create_run_records(user_input_filename: str) -> Dict[str, Any]:
     return {
         "run_id": None,
         "run_dir": str(run_dir),
+        "run_dir_path": run_dir,
         "config": cfg,
         "metrics": PipelineMetrics(),
         "cancel_event": _create_cancel_event(),
@@ -141,25 +341,25 @@ async def async_run_intake(run_id: str) -> None:
     if not meta:
         return
 
-    logger.info("########## INTAKE STARTED ########## [run=%s]", run_id)
+    async with _INTAKE_SEM:
+        logger.info("########## INTAKE STARTED ########## [run=%s]", run_id)
 
-    cfg = meta["config"]
-    cfg.cancellation_token = meta["cancel_event"]
+        cfg = meta["config"]
+        cfg.cancellation_token = meta["cancel_event"]
 
-    await safe_update_run(run_id, status="intake_running", phase="intake")
-    await _write_progress(meta["run_dir"], "intake", {"status": "started"})
+        await _transition(run_id, "intake", "started", status="intake_running", phase="intake")
 
-    try:
-        await _maybe_awaitable_call(run_user_intake_stage, cfg, meta["metrics"])
+        try:
+            await _maybe_awaitable_call(run_user_intake_stage, cfg, meta["metrics"])
 
-        await safe_update_run(run_id, status="intake_completed", phase="research")
-        await _write_progress(meta["run_dir"], "intake", {"status": "completed"})
+            await _transition(run_id, "intake", "completed", status="intake_completed", phase="research")
 
-        logger.info("########## INTAKE COMPLETED ########## [run=%s]", run_id)
+            logger.info("########## INTAKE COMPLETED ########## [run=%s]", run_id)
 
-    except Exception as e:
-        await safe_update_run(run_id, status="intake_failed", error=str(e))
-        logger.exception("########## INTAKE FAILED ########## [run=%s]", run_id)
+        except Exception as e:
+            await safe_update_run(run_id, status="intake_failed", error=str(e))
+            logger.exception("########## INTAKE FAILED ########## [run=%s]", run_id)
+            release_run_lock(run_id)
 
 
 async def async_run_research(run_id: str) -> None:
@@ -167,40 +367,41 @@ async def async_run_research(run_id: str) -> None:
     if not meta:
         return
 
-    logger.info("########## RESEARCH STARTED ########## [run=%s]", run_id)
+    async with _RESEARCH_SEM:
+        logger.info("########## RESEARCH STARTED ########## [run=%s]", run_id)
 
-    cfg = meta["config"]
-    cfg.cancellation_token = meta["cancel_event"]
+        cfg = meta["config"]
+        cfg.cancellation_token = meta["cancel_event"]
 
-    await safe_update_run(run_id, status="research_running", phase="research")
-    await _write_progress(meta["run_dir"], "research", {"status": "started"})
+        await _transition(run_id, "research", "started", status="research_running", phase="research")
 
-    try:
-        await _maybe_awaitable_call(
-            run_research_from_queries,
-            cfg,
-            meta["metrics"],
-            run_dir=Path(meta["run_dir"]),
-        )
+        try:
+            await _maybe_awaitable_call(
+                run_research_from_queries,
+                cfg,
+                meta["metrics"],
+                run_dir=meta["run_dir_path"],
+            )
 
-        await safe_update_run(run_id, status="research_completed", phase="research_done")
-        await _write_progress(meta["run_dir"], "research", {"status": "completed"})
+            await _transition(
+                run_id, "research", "completed", status="research_completed", phase="research_done"
+            )
 
-        logger.info("########## RESEARCH COMPLETED ########## [run=%s]", run_id)
+            logger.info("########## RESEARCH COMPLETED ########## [run=%s]", run_id)
 
-    except Exception as e:
-        await safe_update_run(run_id, status="research_failed", error=str(e))
-        logger.exception("########## RESEARCH FAILED ########## [run=%s]", run_id)
-        return
+        except Exception as e:
+            await safe_update_run(run_id, status="research_failed", error=str(e))
+            logger.exception("########## RESEARCH FAILED ########## [run=%s]", run_id)
+            return
 
     if meta.get("execution_mode") == "email":
+        # research permit is released here; finalize waits on its own
         logger.info("########## AUTO-FINALIZE TRIGGERED ########## [run=%s]", run_id)
-        async with _PIPELINE_SEMAPHORE:
-            await async_run_finalize(run_id)
+        await async_run_finalize(run_id)
 
 
 async def async_run_finalize(run_id: str) -> None:
-    async with _RUNS_LOCK:
+    async with _lock_for(run_id):
         meta = RUNS.get(run_id)
         if not meta:
             return
@@ -210,50 +411,59 @@ async def async_run_finalize(run_id: str) -> None:
         if meta.get("phase") == "finalize":
             logger.info("Finalize already running [run=%s]", run_id)
             return
-        RUNS[run_id]["phase"] = "finalize"
-        RUNS[run_id]["status"] = "finalize_running"
-    
-    async with _RUNS_LOCK:
-        meta = RUNS[run_id]
+        meta["phase"] = "finalize"
+        meta["status"] = "finalize_running"
+
+    async with _FINALIZE_SEM:
+        logger.info("########## FINALIZE STARTED ########## [run=%s]", run_id)
+        cfg = meta["config"]
+        cfg.cancellation_token = meta["cancel_event"]
+        await _write_progress(meta["run_dir_path"], "finalize", {"status": "started"})
     
-    logger.info("########## FINALIZE STARTED ########## [run=%s]", run_id)
-    cfg = meta["config"]
-    cfg.cancellation_token = meta["cancel_event"]
-    await _write_progress(meta["run_dir"], "finalize", {"status": "started"})
-    
-    try:
-        if meta["cancel_event"].is_set():
-            raise Exception("Run cancelled")
+        try:
+            if meta["cancel_event"].is_set():
+                raise Exception("Run cancelled")
         
-        await _maybe_awaitable_call(run_deduplication, cfg, meta["metrics"])
+            # Stage DAG: dedup -> enrichment -> sorting -> export, each reading the
+            # previous stage's output. The only independent work is connecting the
+            # enrichment agent's MCP servers, which can overlap dedup on opt-in.
+            if cfg.finalize_parallel:
+                await asyncio.gather(
+                    _maybe_awaitable_call(run_deduplication, cfg, meta["metrics"]),
+                    _maybe_awaitable_call(warm_enrichment_agent),
+                )
+            else:
+                await _maybe_awaitable_call(run_deduplication, cfg, meta["metrics"])
         
-        await _maybe_awaitable_call(run_enrichment_stage, cfg, meta["metrics"])
+            await _maybe_awaitable_call(run_enrichment_stage, cfg, meta["metrics"])
         
-        await _maybe_awaitable_call(run_sorting, cfg, meta["metrics"])
+            await _maybe_awaitable_call(run_sorting, cfg, meta["metrics"])
         
-        await _maybe_awaitable_call(run_export_to_excel, cfg, meta["metrics"])
+            async with _EXPORT_SEM:
+                await _maybe_awaitable_call(run_export_to_excel, cfg, meta["metrics"])
         
-        email = meta.get("email")
-        if email and not meta.get("email_sent"):
-            excel = Path(cfg.excel_out_path)
-            if excel.exists():
-                try:
-                    logger.info("########## EMAIL SENDING ########## [run=%s]", run_id)
-                    await asyncio.to_thread(
-                        send_lead_notification,
-                        email,
-                        str(excel),
+            email = meta.get("email")
+            if email and not meta.get("email_sent"):
+                excel = Path(cfg.excel_out_path)
+                if excel.exists():
+                    # wait for the send so email_sent is settled before the
+                    # run reports finalize_completed
+                    job = EmailJob(
+                        run_id, email, str(excel), asyncio.get_running_loop().create_future()
                     )
-                    await safe_update_run(run_id, email_sent=True, email_sent_to=email)
-                    logger.info("########## EMAIL SENT ########## [run=%s]", run_id)
-                except Exception as email_error:
-                    logger.exception("########## EMAIL FAILED ########## [run=%s]", run_id)
-                    await safe_update_run(run_id, email_error=str(email_error))
+                    await _enqueue_email(job)
+                    try:
+                        await job.done
+                    except CustomException as email_error:
+                        # an unsent email does not fail the finalized leads
+                        await safe_update_run(run_id, email_error=str(email_error))
         
-        await safe_update_run(run_id, status="finalize_completed", phase="done")
-        await _write_progress(meta["run_dir"], "finalize", {"status": "completed"})
-        logger.info("########## FINALIZE COMPLETED ########## [run=%s]", run_id)
+            await _transition(run_id, "finalize", "completed", status="finalize_completed", phase="done")
+            logger.info("########## FINALIZE COMPLETED ########## [run=%s]", run_id)
         
-    except Exception as e:
-        await safe_update_run(run_id, status="finalize_failed", error=str(e))
-        logger.exception("########## FINALIZE FAILED ########## [run=%s]", run_id)
\ No newline at end of file
+        except Exception as e:
+            await safe_update_run(run_id, status="finalize_failed", error=str(e))
+            logger.exception("########## FINALIZE FAILED ########## [run=%s]", run_id)
+
+        finally:
+            release_run_lock(run_id)
@@ -1,5 +1,4 @@
 import sys
-import traceback
 from typing import Optional, Any
 
 from utils.logger import logging
@@ -17,11 +16,11 @@ def error_message_details(error: Any, error_detail: Optional[object] = None) ->
         line_no = -1
 
         if tb is not None:
-            frames = traceback.extract_tb(tb)
-            if frames:
-                last = frames[-1]
-                file_name = last.filename
-                line_no = last.lineno
+            # innermost frame, without materializing the whole stack
+            while tb.tb_next is not None:
+                tb = tb.tb_next
+            file_name = tb.tb_frame.f_code.co_filename
+            line_no = tb.tb_lineno
         else:
             try:
                 _, _, exc_tb = ed.exc_info()
@@ -38,23 +37,46 @@ def error_message_details(error: Any, error_detail: Optional[object] = None) ->
             except Exception:
                 pass
 
-        error_message = (
-            "Error occured in python script name [{0}] line number [{1}] error message[{2}]"
-        ).format(file_name, line_no, str(error))
-
-        return error_message
+        return (
+            f"Error occurred in python script name [{file_name}] "
+            f"line number [{line_no}] error message[{error}]"
+        )
 
     except Exception as e:
         logger.exception("error_message_details failed while formatting error: %r", error)
-        return f"Error occured but formatting failed: {str(error)} (formatter error: {e})"
+        return f"Error occurred but formatting failed: {str(error)} (formatter error: {e})"
+
+
+class _ExcInfoSnapshot:
+    """exc_info() captured at raise time, for formatting later outside the handler."""
+
+    __slots__ = ("_info",)
+
+    def __init__(self, info):
+        self._info = info
+
+    def exc_info(self):
+        return self._info
 
 
 class CustomException(Exception):
     def __init__(self, error_message: Any, error_detail: Optional[object] = None):
         self.original = error_message
-        msg = error_message_details(error_message, error_detail=error_detail)
-        super().__init__(str(msg))
-        self.error_message = msg
+        super().__init__(error_message)
+
+        # details are formatted on first str(); only the exc_info fallback
+        # depends on when it runs, so snapshot that now (a pointer copy)
+        if getattr(error_message, "__traceback__", None) is None:
+            ed = error_detail if error_detail is not None else sys
+            error_detail = _ExcInfoSnapshot(ed.exc_info())
+        self._detail = error_detail
+        self._cached: Optional[str] = None
+
+    @property
+    def error_message(self) -> str:
+        return str(self)
 
     def __str__(self) -> str:
-        return self.error_message
+        if self._cached is None:
+            self._cached = error_message_details(self.original, error_detail=self._detail)
+        return self._cached
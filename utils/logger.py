@@ -1,4 +1,5 @@
 import logging
+import multiprocessing
 import os
 
 logs_path = os.path.join(os.getcwd(), "logs")
@@ -6,7 +7,8 @@ os.makedirs(logs_path, exist_ok=True)
 
 LOG_FILE_PATH = os.path.join(logs_path, "running_log.log")
 
-if os.path.exists(LOG_FILE_PATH):
+# fresh log per process start; pool workers re-import this and must not wipe it
+if os.path.exists(LOG_FILE_PATH) and multiprocessing.current_process().name == "MainProcess":
     with open(LOG_FILE_PATH, "w") as f:
         f.truncate(0)
 
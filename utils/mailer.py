@@ -0,0 +1,106 @@
+import asyncio
+import weakref
+from contextlib import suppress
+from email.message import Message
+from typing import Optional
+
+import aiosmtplib
+
+from utils.logger import logging
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 465
+
+
+class PooledMailer:
+    """
+    Keeps one authenticated SMTP session open and reuses it across sends.
+    Sends are serialized on a lock; a dropped connection is re-opened once.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        hostname: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        timeout: float = 30.0,
+    ):
+        self.username = username
+        self.password = password
+        self.hostname = hostname
+        self.port = port
+        self.timeout = timeout
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=True,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        await smtp.login(self.username, self.password)
+        logger.info("SMTP session opened [%s:%s]", self.hostname, self.port)
+        return smtp
+
+    async def _drop(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            with suppress(Exception):
+                smtp.close()
+
+    async def send(self, msg: Message) -> None:
+        async with self._lock:
+            for attempt in (1, 2):
+                if self._smtp is None or not self._smtp.is_connected:
+                    await self._drop()
+                    self._smtp = await self._connect()
+                try:
+                    await self._smtp.send_message(msg)
+                    return
+                except aiosmtplib.SMTPServerDisconnected:
+                    # idle sessions get closed server-side; reconnect once
+                    await self._drop()
+                    if attempt == 2:
+                        raise
+                    logger.info("SMTP session dropped, reconnecting")
+
+    async def close(self) -> None:
+        async with self._lock:
+            smtp, self._smtp = self._smtp, None
+            if smtp is not None and smtp.is_connected:
+                with suppress(Exception):
+                    await smtp.quit()
+
+
+# one mailer per event loop: aiosmtplib transports are loop-bound
+_MAILERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PooledMailer]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_mailer(
+    sender_email: Optional[str], app_password: Optional[str]
+) -> Optional[PooledMailer]:
+    """Return the running loop's mailer, or None when credentials are missing."""
+    if not sender_email or not app_password:
+        return None
+
+    loop = asyncio.get_running_loop()
+    mailer = _MAILERS.get(loop)
+    if mailer is None:
+        mailer = PooledMailer(sender_email, app_password)
+        _MAILERS[loop] = mailer
+    return mailer
+
+
+async def close_mailer() -> None:
+    loop = asyncio.get_running_loop()
+    mailer = _MAILERS.pop(loop, None)
+    if mailer is not None:
+        await mailer.close()
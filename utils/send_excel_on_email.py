@@ -1,3 +1,4 @@
+import asyncio
 import smtplib
 import os
 from dotenv import load_dotenv
@@ -7,24 +8,23 @@ from email.mime.base import MIMEBase
 from email import encoders
 from email.utils import formataddr
 
-load_dotenv()
+from utils.logger import logging
+from utils.mailer import SMTP_HOST, SMTP_PORT, get_mailer
 
-def send_lead_notification(
-    recipient_email: str,
-    excel_path: str | None = None,
-):
-    sender_email = os.getenv("EMAIL_SENDER")
-    app_password = os.getenv("EMAIL_PASSWORD")
+logger = logging.getLogger(__name__)
 
-    display_name = "LeadFoundry AI"
+load_dotenv()
 
-    if not sender_email or not app_password:
-        print("Error: Missing credentials in .env file")
-        return False
+# credentials don't change at runtime; read them once
+_SENDER = os.getenv("EMAIL_SENDER")
+_PASSWORD = os.getenv("EMAIL_PASSWORD")
+_DISPLAY_NAME = "LeadFoundry AI"
 
-    subject = "LeadFoundry Run Complete — Results Attached"
 
-    html_content = """
+# =========================
+# Email body templates (built once at import)
+# =========================
+_HTML_OK = """
     <html>
     <body style="font-family: Arial, Helvetica, sans-serif; line-height: 1.6;">
         <p>Hello,</p>
@@ -53,63 +53,129 @@ def send_lead_notification(
     </html>
     """
 
-    try:
-        msg = MIMEMultipart()
-        msg["From"] = formataddr((display_name, sender_email))
-        msg["To"] = recipient_email
-        msg["Subject"] = subject
-
-        excel_attached = False
-        excel_error_note = ""
-
-        # =========================
-        # Attach Excel if available
-        # =========================
-        if excel_path:
-            try:
-                if not os.path.exists(excel_path):
-                    raise FileNotFoundError(f"Excel file not found: {excel_path}")
-
-                with open(excel_path, "rb") as f:
-                    part = MIMEBase(
-                        "application",
-                        "vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    )
-                    part.set_payload(f.read())
-
-                encoders.encode_base64(part)
-                part.add_header(
-                    "Content-Disposition",
-                    f'attachment; filename="{os.path.basename(excel_path)}"',
-                )
-                msg.attach(part)
-                excel_attached = True
-
-            except Exception as e:
-                excel_error_note = (
-                    "<hr>"
-                    "<p><b>⚠️ Note:</b> The lead generation completed successfully, "
-                    "but the Excel file could not be attached for this run.</p>"
+_HTML_ERROR_NOTE = (
+    "<hr>"
+    "<p><b>⚠️ Note:</b> The lead generation completed successfully, "
+    "but the Excel file could not be attached for this run.</p>"
+)
+
+_HTML_WITH_ERROR = _HTML_OK + _HTML_ERROR_NOTE
+
+_DEFAULT_SUBJECT = "LeadFoundry Run Complete — Results Attached"
+_DEFAULT_HTML = _HTML_OK
+
+
+def build_lead_notification(
+    recipient_email: str,
+    excel_path: str | None = None,
+    subject: str = _DEFAULT_SUBJECT,
+    html_content: str = _DEFAULT_HTML,
+) -> MIMEMultipart | None:
+    """
+    Build the run-complete email (Excel attached when available).
+    Returns None when sender credentials are missing.
+    """
+    if not _SENDER or not _PASSWORD:
+        logger.error("Missing email credentials in .env file")
+        return None
+
+    msg = MIMEMultipart()
+    msg["From"] = formataddr((_DISPLAY_NAME, _SENDER))
+    msg["To"] = recipient_email
+    msg["Subject"] = subject
+
+    excel_attached = False
+
+    # =========================
+    # Attach Excel if available
+    # =========================
+    if excel_path:
+        try:
+            if not os.path.exists(excel_path):
+                raise FileNotFoundError(f"Excel file not found: {excel_path}")
+
+            with open(excel_path, "rb") as f:
+                part = MIMEBase(
+                    "application",
+                    "vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 )
-                print(f"⚠️ Excel attachment skipped: {e}")
+                part.set_payload(f.read())
+
+            encoders.encode_base64(part)
+            part.add_header(
+                "Content-Disposition",
+                f'attachment; filename="{os.path.basename(excel_path)}"',
+            )
+            msg.attach(part)
+            excel_attached = True
+
+        except Exception as e:
+            logger.warning("Excel attachment skipped: %s", e)
+
+    # =========================
+    # Final email body
+    # =========================
+    final_html = html_content
+    if excel_path and not excel_attached:
+        final_html = (
+            _HTML_WITH_ERROR
+            if html_content is _DEFAULT_HTML
+            else html_content + _HTML_ERROR_NOTE
+        )
+
+    msg.attach(MIMEText(final_html, "html"))
+    return msg
 
-        # =========================
-        # Final email body
-        # =========================
-        final_html = html_content
-        if not excel_attached and excel_path:
-            final_html += excel_error_note
 
-        msg.attach(MIMEText(final_html, "html"))
+def send_lead_notification(
+    recipient_email: str,
+    excel_path: str | None = None,
+    subject: str = _DEFAULT_SUBJECT,
+    html_content: str = _DEFAULT_HTML,
+):
+    try:
+        msg = build_lead_notification(recipient_email, excel_path, subject, html_content)
+        if msg is None:
+            return False
 
-        server = smtplib.SMTP_SSL("smtp.gmail.com", 465)
-        server.login(sender_email, app_password)
+        server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT)
+        server.login(_SENDER, _PASSWORD)
         server.send_message(msg)
         server.quit()
 
-        print(f"Email sent to {recipient_email} from {display_name}")
+        logger.info("Email sent to %s from %s", recipient_email, msg["From"])
+        return True
+
+    except Exception as e:
+        logger.exception("Error sending email to %s: %s", recipient_email, e)
+        return False
+
+
+async def send_lead_notification_async(
+    recipient_email: str,
+    excel_path: str | None = None,
+    subject: str = _DEFAULT_SUBJECT,
+    html_content: str = _DEFAULT_HTML,
+) -> bool:
+    """Same as send_lead_notification, sent on-loop over the pooled SMTP session."""
+    mailer = get_mailer(_SENDER, _PASSWORD)
+    if mailer is None:
+        logger.error("Missing email credentials in .env file")
+        return False
+
+    try:
+        # stat + mmap + base64 of the xlsx stay off the event loop
+        msg = await asyncio.to_thread(
+            build_lead_notification, recipient_email, excel_path, subject, html_content
+        )
+        if msg is None:
+            return False
+
+        await mailer.send(msg)
+
+        logger.info("Email sent to %s from %s", recipient_email, msg["From"])
         return True
 
     except Exception as e:
-        print(f"❌ Error sending email: {e}")
+        logger.exception("Error sending email to %s: %s", recipient_email, e)
         return False